@@ -10,25 +10,155 @@
 #
 # Requisitos adicionales opcionales para graficar:
 #   pip install networkx matplotlib
+# Opcional para Kahn en grafos enormes (500k+ materias):
+#   pip install numba
+# Opcional para cargar/guardar JSON más rápido:
+#   pip install orjson
 #
 from __future__ import annotations
-from collections import defaultdict, deque
+from array import array
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Dict, Set, List, Tuple, Optional
+from typing import Dict, Set, FrozenSet, List, Tuple, Optional
 import json, os, re, time, csv
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _kahn_csr(indptr, indices, indegree, order):
+    # Kahn sobre CSR; modifica indegree y llena order. Devuelve cuántos nodos se ordenaron.
+    # order hace de cola FIFO (head = lectura, tail = escritura): sin deque, compatible con numba.
+    tail = 0
+    for u in range(len(indegree)):
+        if indegree[u] == 0:
+            order[tail] = u
+            tail += 1
+    head = 0
+    while head < tail:
+        u = order[head]
+        head += 1
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            indegree[v] -= 1
+            if indegree[v] == 0:
+                order[tail] = v
+                tail += 1
+    return tail
+
+# Numba solo compensa en grafos enormes: importarlo y cargar el kernel compilado cuesta
+# ~0.4 s aun con el cache en disco, mientras Kahn en Python puro tarda ~0.07 s con 100k
+# nodos y ~0.5 s con 600k. Por eso se importa bajo demanda y solo a partir de este tamaño.
+_JIT_MIN_NODES = 500_000
+_kahn_jit = None
+
+def _load_kahn_jit():
+    global _kahn_jit
+    if _kahn_jit is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:
+            _kahn_jit = False
+        else:
+            _kahn_jit = njit(cache=True)(_kahn_csr)
+            # Compila (o carga del cache en disco) ahora, no en la primera llamada real
+            z = np.zeros(0, dtype=np.intc)
+            _kahn_jit(np.zeros(1, dtype=np.intc), z, z.copy(), z.copy())
+    return _kahn_jit or None
+
+def _run_kahn(indptr, indices, indegree, order) -> int:
+    if len(indegree) >= _JIT_MIN_NODES:
+        jit = _load_kahn_jit()
+        if jit is not None:
+            import numpy as np
+            # Vistas sin copia sobre los array('i')
+            return int(jit(*(np.frombuffer(a, dtype=np.intc) for a in (indptr, indices, indegree, order))))
+    return _kahn_csr(indptr, indices, indegree, order)
+
+if hasattr(int, "bit_count"):
+    def _popcount(x: int) -> int:
+        return x.bit_count()
+else:  # Python < 3.10
+    def _popcount(x: int) -> int:
+        return bin(x).count("1")
+
+# Cada máscara de prerrequisitos ocupa hasta V bits (hasta V²/8 bytes en total) y cada
+# test mask & ~passed cuesta O(V/64), así que candidatas/indegree efectivo son O(V²/64).
+# Medido: hasta ~2k materias ganan a los conjuntos; por encima no se construyen y se usan
+# los snapshots de conjuntos (_freeze). Con 2k materias ocupan como mucho ~0.5 MB.
+_MASK_MAX_NODES = 2_000
+
+@dataclass
+class CSRGraph:
+    # Grafo con ids enteros contiguos: sucesores de u en indices[indptr[u]:indptr[u+1]]
+    code_to_id: Dict[str, int]
+    id_to_code: List[str]
+    indptr: array
+    indices: array
+    indegree: array
+    prereq_mask: Optional[List[int]]  # bit j encendido <=> id j es prerrequisito de id i
+
+    def bits_of(self, codes) -> int:
+        mask = 0
+        for c in codes:
+            i = self.code_to_id.get(c)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+_LEVEL_RE = re.compile(r'\d+')
+
 @dataclass
 class Course:
     code: str
     name: str
     credits: int
+    level: int = field(default=9999, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Nivel = primer número del código (MAT101 -> 101); se calcula una vez al crear
+        m = _LEVEL_RE.search(self.code)
+        self.level = int(m.group()) if m else 9999
 
 @dataclass
 class PMaPModel:
+    # courses/prereqs se modifican solo con add_course/add_prereq: el grafo derivado
+    # se cachea y una mutación directa de los dicts deja resultados obsoletos.
     courses: Dict[str, Course] = field(default_factory=dict)
     prereqs: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
     passed: Set[str] = field(default_factory=set)
+    _graph_cache: Optional[Tuple[Dict[str, Set[str]], Dict[str, int]]] = field(default=None, init=False, repr=False, compare=False)
+    _cache_dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    _csr_cache: Optional[CSRGraph] = field(default=None, init=False, repr=False, compare=False)
+    _prereqs_frozen: Optional[Dict[str, FrozenSet[str]]] = field(default=None, init=False, repr=False, compare=False)
+    _adj_tuple: Optional[Dict[str, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+    _dict_cache: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    # Orden topológico en línea (Pearce–Kelly); None = hay que recalcular con Kahn
+    _order: Optional[List[str]] = field(default=None, init=False, repr=False, compare=False)
+    _n2i: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _succ: Dict[str, Set[str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def _invalidate(self):
+        self._cache_dirty = True
+        self._prereqs_frozen = None
+        self._adj_tuple = None
+        self._dict_cache = None
+
+    def _freeze(self) -> Tuple[Dict[str, FrozenSet[str]], Dict[str, Tuple[str, ...]]]:
+        # Snapshot inmutable de prereqs y adyacencia (tuplas ordenadas); se recalcula tras cada mutación
+        if self._prereqs_frozen is None or self._adj_tuple is None:
+            adjacency, _ = self.build_graph()
+            self._prereqs_frozen = {c: frozenset(self.prereqs.get(c, ())) for c in self.courses}
+            self._adj_tuple = {c: tuple(sorted(vs)) for c, vs in adjacency.items()}
+        return self._prereqs_frozen, self._adj_tuple
 
     def to_dict(self) -> dict:
         return {
@@ -40,6 +170,15 @@ class PMaPModel:
             "passed": sorted(list(self.passed)),
         }
 
+    def _serialized(self) -> dict:
+        # to_dict cacheado hasta la próxima mutación de courses/prereqs; solo lectura (save_json).
+        # passed se relee siempre: es barato y así no depende de que se use mark_passed.
+        if self._dict_cache is None:
+            self._dict_cache = self.to_dict()
+        else:
+            self._dict_cache["passed"] = sorted(self.passed)
+        return self._dict_cache
+
     @staticmethod
     def from_dict(data: dict) -> 'PMaPModel':
         model = PMaPModel()
@@ -57,19 +196,24 @@ class PMaPModel:
 
     def save_json(self, path: str):
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        # Se serializa completo y se escribe de una vez (orjson si está disponible)
+        with open(path, "wb") as f:
+            f.write(_json_dumps(self._serialized()))
 
     @staticmethod
     def load_json(path: str) -> 'PMaPModel':
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # Una sola lectura en bytes; orjson si está disponible
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         return PMaPModel.from_dict(data)
 
     def add_course(self, code: str, name: str, credits: int):
         code = code.strip().upper()
         self.courses[code] = Course(code, name.strip(), int(credits))
         _ = self.prereqs[code]
+        self._pk_add_node(code)
+        self._invalidate()
 
     def add_prereq(self, prereq: str, course: str):
         prereq = prereq.strip().upper()
@@ -78,9 +222,60 @@ class PMaPModel:
             raise ValueError("Una materia no puede ser prerrequisito de sí misma.")
         if prereq not in self.courses:
             self.courses[prereq] = Course(prereq, prereq, 0)
+            self._pk_add_node(prereq)
         if course not in self.courses:
             self.courses[course] = Course(course, course, 0)
+            self._pk_add_node(course)
         self.prereqs[course].add(prereq)
+        self._pk_add_edge(prereq, course)
+        self._invalidate()
+
+    def _pk_add_node(self, code: str):
+        if self._order is not None and code not in self._n2i:
+            self._n2i[code] = len(self._order)
+            self._order.append(code)
+            self._succ[code] = set()
+
+    def _pk_add_edge(self, u: str, v: str):
+        # Pearce–Kelly: solo se reordena la región afectada [n2i[v], n2i[u]]
+        if self._order is None:
+            return
+        n2i, succ = self._n2i, self._succ
+        succ[u].add(v)
+        lb, ub = n2i[v], n2i[u]
+        if lb >= ub:
+            return
+        delta_f: List[str] = []
+        seen = {v}
+        stack = [v]
+        while stack:
+            x = stack.pop()
+            delta_f.append(x)
+            for y in succ[x]:
+                if y == u:
+                    # La arista cierra un ciclo: se abandona el orden incremental
+                    self._order = None
+                    return
+                if y not in seen and n2i[y] < ub:
+                    seen.add(y)
+                    stack.append(y)
+        delta_b: List[str] = []
+        seen = {u}
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            delta_b.append(x)
+            for y in self.prereqs.get(x, ()):
+                if y not in seen and n2i[y] > lb:
+                    seen.add(y)
+                    stack.append(y)
+        delta_b.sort(key=n2i.__getitem__)
+        delta_f.sort(key=n2i.__getitem__)
+        nodes = delta_b + delta_f
+        slots = sorted(n2i[x] for x in nodes)
+        for i, x in zip(slots, nodes):
+            n2i[x] = i
+            self._order[i] = x
 
     def mark_passed(self, code: str):
         code = code.strip().upper()
@@ -89,47 +284,84 @@ class PMaPModel:
         self.passed.add(code)
 
     def build_graph(self) -> Tuple[Dict[str, Set[str]], Dict[str, int]]:
+        # Resultado cacheado y compartido: no modificar los dicts devueltos.
+        # No depende de passed, así que mark_passed no lo invalida.
+        if not self._cache_dirty and self._graph_cache is not None:
+            return self._graph_cache
         adjacency: Dict[str, Set[str]] = {c: set() for c in self.courses}
         indegree: Dict[str, int] = {c: 0 for c in self.courses}
+        # Toda materia de prereqs ya está en courses (add_prereq/from_dict la registran)
         for course, pres in self.prereqs.items():
             for p in pres:
-                adjacency.setdefault(p, set()).add(course)
-                indegree[course] = indegree.get(course, 0) + 1
-                indegree.setdefault(p, 0)
-        for c in self.courses:
-            adjacency.setdefault(c, set())
-            indegree.setdefault(c, 0)
+                adjacency[p].add(course)
+            indegree[course] += len(pres)
+        # Versión CSR (ids enteros contiguos) para Kahn
+        id_to_code = list(indegree)
+        code_to_id = {c: i for i, c in enumerate(id_to_code)}
+        csr_indptr = [0]
+        csr_indices: List[int] = []
+        for c in id_to_code:
+            csr_indices.extend(code_to_id[v] for v in adjacency.get(c, ()))
+            csr_indptr.append(len(csr_indices))
+        prereq_mask: Optional[List[int]] = None
+        if len(id_to_code) <= _MASK_MAX_NODES:
+            prereq_mask = []
+            for c in id_to_code:
+                mask = 0
+                for p in self.prereqs.get(c, ()):
+                    mask |= 1 << code_to_id[p]
+                prereq_mask.append(mask)
+        self._csr_cache = CSRGraph(
+            code_to_id, id_to_code,
+            array('i', csr_indptr), array('i', csr_indices), array('i', indegree.values()),
+            prereq_mask,
+        )
+        self._graph_cache = (adjacency, indegree)
+        self._cache_dirty = False
         return adjacency, indegree
 
-    def topo_sort(self) -> Tuple[List[str], bool, Optional[List[str]]]:
-        adjacency, indegree = self.build_graph()
-        q = deque([c for c, d in indegree.items() if d == 0])
-        order: List[str] = []
-        indegree_copy = dict(indegree)
-        while q:
-            u = q.popleft()
-            order.append(u)
-            for v in adjacency.get(u, []):
-                indegree_copy[v] -= 1
-                if indegree_copy[v] == 0:
-                    q.append(v)
-        has_cycle = len(order) != len(indegree_copy)
-        cycle = None
+    def build_csr(self) -> CSRGraph:
+        """Grafo en formato CSR (cacheado igual que build_graph)."""
+        self.build_graph()
+        return self._csr_cache
+
+    def topo_sort(self, force: bool = False) -> Tuple[List[str], bool, Optional[List[str]]]:
+        # force=True ignora el orden incremental y corre Kahn (p. ej. para medirlo)
+        if self._order is not None and not force:
+            return list(self._order), False, None
+        g = self.build_csr()
+        id_to_code, indptr, indices = g.id_to_code, g.indptr, g.indices
+        n = len(id_to_code)
+        # Única copia (memcpy): el indegree del CSR es del cache compartido y Kahn lo consume
+        indeg = array('i', g.indegree)
+        order_ids = array('i', [0]) * n
+        done = _run_kahn(indptr, indices, indeg, order_ids)
+        order = [id_to_code[u] for u in order_ids[:done]]
+        has_cycle = done != n
+        cycle: Optional[List[str]] = None
         if has_cycle:
-            visited = set()
-            stack = set()
-            parent = {}
-            def dfs(u):
-                nonlocal cycle
-                visited.add(u)
-                stack.add(u)
-                for v in adjacency.get(u, []):
-                    if indegree_copy[v] > 0:
+            visited: Set[int] = set()
+            on_stack: Set[int] = set()
+            parent: Dict[int, int] = {}
+            for node in range(n):
+                if indeg[node] == 0 or node in visited:
+                    continue
+                visited.add(node)
+                on_stack.add(node)
+                stack = [(node, iter(indices[indptr[node]:indptr[node + 1]]))]
+                while stack and cycle is None:
+                    u, it = stack[-1]
+                    v = next(it, None)
+                    if v is None:
+                        on_stack.discard(u)
+                        stack.pop()
+                    elif indeg[v] > 0:
                         if v not in visited:
                             parent[v] = u
-                            if dfs(v):
-                                return True
-                        elif v in stack:
+                            visited.add(v)
+                            on_stack.add(v)
+                            stack.append((v, iter(indices[indptr[v]:indptr[v + 1]])))
+                        elif v in on_stack:
                             path = [v]
                             cur = u
                             while cur != v:
@@ -137,58 +369,95 @@ class PMaPModel:
                                 cur = parent[cur]
                             path.append(v)
                             path.reverse()
-                            cycle = path
-                            return True
-                stack.remove(u)
-                return False
-            for node, deg in indegree_copy.items():
-                if deg > 0 and node not in visited:
-                    if dfs(node):
-                        break
+                            cycle = [id_to_code[x] for x in path]
+                if cycle is not None:
+                    break
+        if not has_cycle:
+            adjacency, _ = self.build_graph()
+            self._order = list(order)
+            self._n2i = {c: i for i, c in enumerate(order)}
+            self._succ = {c: set(vs) for c, vs in adjacency.items()}
         return order, has_cycle, cycle
 
+    def _passed_bits(self, passed: Set[str]) -> Optional[int]:
+        # passed como máscara sobre los ids de build_csr(); None si el grafo no tiene máscaras
+        g = self.build_csr()
+        return g.bits_of(passed) if g.prereq_mask is not None else None
+
     def current_indegree_effective(self) -> Dict[str, int]:
-        indeg = {c: 0 for c in self.courses}
-        for course, pres in self.prereqs.items():
-            for p in pres:
-                if p not in self.passed:
-                    indeg[course] += 1
-        return indeg
+        g = self.build_csr()
+        pm = self._passed_bits(self.passed)
+        if pm is None:
+            prereqs, _ = self._freeze()
+            passed = self.passed
+            return {c: sum(1 for p in pres if p not in passed) for c, pres in prereqs.items()}
+        pending = ~pm
+        return {c: _popcount(mask & pending) for c, mask in zip(g.id_to_code, g.prereq_mask)}
 
     def candidates(self) -> List[str]:
-        indeg_eff = self.current_indegree_effective()
-        return sorted([c for c, d in indeg_eff.items() if d == 0 and c not in self.passed])
+        return self._ready(self.passed)
+
+    def _unlocks(self, course_code: str, passed: Set[str], pm: Optional[int] = None) -> int:
+        # v se libera si todos sus prerrequisitos salvo course_code están aprobados.
+        # Con pm (máscara de passed) es un AND por sucesor; sin ella, recorrido sobre conjuntos.
+        if pm is not None:
+            g = self.build_csr()
+            u = g.code_to_id.get(course_code)
+            if u is None:
+                return 0
+            pending = ~(pm | 1 << u)
+            prereq_mask = g.prereq_mask
+            return sum(1 for v in g.indices[g.indptr[u]:g.indptr[u + 1]] if not prereq_mask[v] & pending)
+        # Sin conjuntos temporales: corta apenas falta un prerrequisito
+        prereqs, adjacency = self._freeze()
+        cnt = 0
+        for v in adjacency.get(course_code, ()):
+            ok = True
+            for p in prereqs[v]:
+                if p != course_code and p not in passed:
+                    ok = False
+                    break
+            cnt += ok
+        return cnt
 
     def unlock_count(self, course_code: str) -> int:
-        adjacency, _ = self.build_graph()
-        count = 0
-        for v in adjacency.get(course_code, []):
-            other_pres = self.prereqs.get(v, set()) - {course_code}
-            if all(p in self.passed for p in other_pres):
-                count += 1
-        return count
+        return self._unlocks(course_code, self.passed, self._passed_bits(self.passed))
+
+    def _ready(self, passed: Set[str]) -> List[str]:
+        # Candidatas respecto de un conjunto de aprobadas dado (no necesariamente self.passed)
+        g = self.build_csr()
+        pm = self._passed_bits(passed)
+        if pm is None:
+            prereqs, _ = self._freeze()
+            return sorted(c for c, pres in prereqs.items() if c not in passed and pres.issubset(passed))
+        prereq_mask = g.prereq_mask
+        return sorted(c for i, c in enumerate(g.id_to_code) if not (pm >> i) & 1 and not prereq_mask[i] & ~pm)
 
     def suggest_next_semester(self, credit_cap: int, criterion: str = "desbloqueo") -> Tuple[List[str], int, List[str]]:
-        cand = self.candidates()
-        def priority_key(code: str):
-            if criterion == "desbloqueo":
-                return (-self.unlock_count(code), self.courses[code].credits, code)
-            elif criterion == "creditos":
-                return (self.courses[code].credits, code)
-            elif criterion == "nivel":
-                digits = re.findall(r'\d+', code)
-                level = int(digits[0]) if digits else 9999
-                return (level, code)
-            else:
-                return (0, code)
-        cand_sorted = sorted(cand, key=priority_key)
+        return self._pick(self._ready(self.passed), credit_cap, criterion, self.passed)
+
+    def _pick(self, cand: List[str], credit_cap: int, criterion: str, passed: Set[str]) -> Tuple[List[str], int, List[str]]:
+        # Selección greedy bajo el tope
+        pm = self._passed_bits(passed)
+        unlocks = {code: self._unlocks(code, passed, pm) for code in cand}
+        # Criterio resuelto una sola vez; sort evalúa la clave una vez por candidata
+        courses = self.courses
+        if criterion == "desbloqueo":
+            key = lambda c: (-unlocks[c], courses[c].credits, c)
+        elif criterion == "creditos":
+            key = lambda c: (courses[c].credits, c)
+        elif criterion == "nivel":
+            key = lambda c: (courses[c].level, c)
+        else:
+            key = None  # solo por código
+        cand_sorted = sorted(cand, key=key)
         chosen, total, reasons = [], 0, []
         for code in cand_sorted:
-            cr = self.courses[code].credits
+            cr = courses[code].credits
             if total + cr <= credit_cap:
                 chosen.append(code)
                 total += cr
-                reasons.append(f"{code} ({cr} cr) — desbloquea {self.unlock_count(code)} materia(s)")
+                reasons.append(f"{code} ({cr} cr) — desbloquea {unlocks[code]} materia(s)")
         return chosen, total, reasons
 
 EXAMPLE_DATA = {
@@ -322,8 +591,9 @@ def action_export_suggestion(model: PMaPModel):
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["codigo","nombre","creditos","desbloquea","criterio"])
-        for code in chosen:
-            w.writerow([code, model.courses[code].name, model.courses[code].credits, model.unlock_count(code), crit])
+        # unlock_count usa el grafo cacheado; todas las filas van en una sola llamada
+        w.writerows([code, model.courses[code].name, model.courses[code].credits, model.unlock_count(code), crit]
+                    for code in chosen)
         w.writerow([]); w.writerow(["total_creditos", total])
     print(f"Exportado a {csv_path}")
 
@@ -340,17 +610,37 @@ def action_report_blocked(model: PMaPModel):
 def action_metrics(model: PMaPModel):
     adjacency, _ = model.build_graph()
     V = len(adjacency); E = sum(len(v) for v in adjacency.values())
-    t0=time.perf_counter(); _ = model.topo_sort(); t1=time.perf_counter()
+    model.topo_sort()  # calentamiento (p. ej. carga de numba) fuera de la medición
+    t0=time.perf_counter(); _ = model.topo_sort(force=True); t1=time.perf_counter()
     order, has_cycle, cycle = _
     print(f"\nMétricas: V={V} materias, E={E} prerrequisitos")
     print(f"Topo_sort: {(t1-t0)*1e3:.2f} ms — ciclo: {'sí' if has_cycle else 'no'}")
     if has_cycle and cycle:
         print("Ciclo ejemplo:", " -> ".join(cycle))
 
+def leveled_layout(model: PMaPModel) -> Dict[str, Tuple[float, float]]:
+    # x = nivel en el DAG (1 + nivel máximo de sus prerrequisitos), y = posición dentro del nivel.
+    # Las materias que quedan en un ciclo van a una columna extra al final.
+    order, _, _ = model.topo_sort()
+    level: Dict[str, int] = {}
+    for u in order:
+        level[u] = 1 + max((level[p] for p in model.prereqs.get(u, ())), default=0)
+    last = max(level.values(), default=0) + 1
+    for u in model.courses:
+        level.setdefault(u, last)
+    by_level: Dict[int, List[str]] = defaultdict(list)
+    for u in sorted(level):
+        by_level[level[u]].append(u)
+    pos: Dict[str, Tuple[float, float]] = {}
+    for lv, codes in by_level.items():
+        for rank, u in enumerate(codes):
+            pos[u] = (float(lv), float(-rank))
+    return pos
+
 def action_plot_graph(model: PMaPModel):
     try:
         import networkx as nx
-        import matplotlib.pyplot as plt
+        from matplotlib.figure import Figure
     except Exception as e:
         print("Para graficar instala: pip install networkx matplotlib")
         print(f"Detalle: {e}")
@@ -365,25 +655,47 @@ def action_plot_graph(model: PMaPModel):
         if n in model.passed: colors.append("lightgreen")
         elif n in cand: colors.append("khaki")
         else: colors.append("lightblue")
-    pos = nx.spring_layout(G, seed=42)
-    nx.draw(G, pos, with_labels=True, node_color=colors, node_size=1200, arrows=True, arrowsize=20, arrowstyle="-|>")
+    # Layout por niveles del orden topológico (O(V+E)) en vez de spring_layout (O(V²) por iteración)
+    pos = leveled_layout(model)
+    n_levels = len({x for x, _ in pos.values()})
+    max_width = max((-y for _, y in pos.values()), default=0) + 1
+    # Figure propia (sin el estado global de pyplot)
+    fig = Figure(figsize=(max(6.4, 1.6 * n_levels), max(4.8, 0.9 * max_width)))
+    ax = fig.subplots()
+    nx.draw(G, pos, ax=ax, with_labels=True, node_color=colors, node_size=1200, arrows=True, arrowsize=20, arrowstyle="-|>")
     Path("out").mkdir(exist_ok=True)
     out_path = "out/grafo.png"
-    import matplotlib.pyplot as plt
-    plt.title("PMaP — Grafo de prerrequisitos (verde=aprobada, amarillo=candidata)")
-    plt.savefig(out_path, dpi=200, bbox_inches="tight")
-    plt.close()
+    ax.set_title("PMaP — Grafo de prerrequisitos (verde=aprobada, amarillo=candidata)")
+    fig.savefig(out_path, dpi=200, bbox_inches="tight")
     print(f"Gráfico guardado en {out_path}")
 
 def plan_full(model: PMaPModel, credit_cap: int, criterion: str = "desbloqueo", max_semesters: int = 12):
-    temp = PMaPModel.from_dict(model.to_dict())
+    # Simula sobre un conjunto de aprobadas local: el modelo no se copia ni se modifica
+    # Se reordena por semestre (no con un heap global): "desbloqueo" depende de las aprobadas
+    # al inicio de cada semestre y lo que se libera en un semestre solo se cursa en el siguiente.
+    # indegree efectivo y candidatas se mantienen entre semestres: al aprobar u solo se
+    # decrementan sus sucesores (O(E) en total en vez de O(V+E) por semestre).
+    g = model.build_csr()
+    code_to_id, id_to_code, indptr, indices = g.code_to_id, g.id_to_code, g.indptr, g.indices
+    passed = set(model.passed)
+    eff = model.current_indegree_effective()
+    indeg_eff = [eff[c] for c in id_to_code]
+    cand = {i for i, d in enumerate(indeg_eff) if d == 0 and id_to_code[i] not in passed}
     semesters = []
     for s in range(1, max_semesters+1):
-        chosen, total, reasons = temp.suggest_next_semester(credit_cap, criterion)
+        chosen, total, reasons = model._pick(sorted(id_to_code[i] for i in cand), credit_cap, criterion, passed)
         if not chosen:
             break
         semesters.append((chosen, total, reasons))
-        for c in chosen: temp.mark_passed(c)
+        passed.update(chosen)
+        for c in chosen:
+            u = code_to_id[c]
+            cand.discard(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                indeg_eff[v] -= 1
+                if indeg_eff[v] == 0 and id_to_code[v] not in passed:
+                    cand.add(v)
     return semesters
 
 def action_plan_full(model: PMaPModel):
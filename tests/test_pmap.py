@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
-from main import PMaPModel
+from unittest import mock
+import main
+from main import PMaPModel, plan_full, leveled_layout
 
 class TestPMaP(unittest.TestCase):
     def setUp(self):
@@ -25,6 +29,16 @@ class TestPMaP(unittest.TestCase):
         self.assertIn("D", cands)   # D sin prereq
         self.assertNotIn("C", cands)  # C depende de B
 
+    def test_candidates_after_mark_passed(self):
+        for limit in (main._MASK_MAX_NODES, -1):  # con y sin máscaras de bits
+            with mock.patch.object(main, "_MASK_MAX_NODES", limit):
+                model = PMaPModel.from_dict(self.model.to_dict())
+                self.assertEqual(model.current_indegree_effective(), {"A":0,"B":0,"C":1,"D":0})
+                self.assertEqual(model.unlock_count("B"), 1)
+                model.mark_passed("B")
+                self.assertEqual(model.candidates(), ["C","D"])
+                self.assertEqual(model.current_indegree_effective()["C"], 0)
+
     def test_cycle_detection(self):
         self.model.add_prereq("C","A")  # A<-B<-C<-A (ciclo)
         order, has_cycle, cycle = self.model.topo_sort()
@@ -32,5 +46,100 @@ class TestPMaP(unittest.TestCase):
         # Debe haber un ciclo detectado o al menos marcado
         assert has_cycle
 
+    def test_cycle_detection_deep_chain(self):
+        model = PMaPModel()
+        n = 5000
+        for i in range(1, n):
+            model.add_prereq(f"X{i-1}", f"X{i}")
+        model.add_prereq(f"X{n-1}", "X0")
+        order, has_cycle, cycle = model.topo_sort()
+        self.assertTrue(has_cycle)
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual(len(cycle), n + 1)
+
+    def test_topo_incremental_after_add_prereq(self):
+        self.model.topo_sort()
+        self.model.add_prereq("C","D")
+        self.model.add_prereq("D","E")
+        order, has_cycle, _ = self.model.topo_sort()
+        self.assertFalse(has_cycle)
+        pos = {c: i for i, c in enumerate(order)}
+        self.assertEqual(set(order), set(["A","B","C","D","E"]))
+        self.assertTrue(pos["A"] < pos["B"] < pos["C"] < pos["D"] < pos["E"])
+        forced, _, _ = self.model.topo_sort(force=True)
+        self.assertEqual(set(forced), set(order))
+        self.model.add_prereq("E","B")
+        self.assertTrue(self.model.topo_sort()[1])
+
+    def test_topo_jit_matches_python(self):
+        if main._load_kahn_jit() is None:
+            self.skipTest("numba no instalado")
+        model = PMaPModel.load_json("data/malla_ampliada.json")
+        expected = model.topo_sort()
+        with mock.patch.object(main, "_JIT_MIN_NODES", 1):
+            self.assertEqual(model.topo_sort(force=True), expected)
+        model.add_prereq("ANL","PROG2")
+        expected = model.topo_sort(force=True)
+        with mock.patch.object(main, "_JIT_MIN_NODES", 1):
+            self.assertEqual(model.topo_sort(force=True), expected)
+
+    def test_build_graph_cache_invalidation(self):
+        adjacency, _ = self.model.build_graph()
+        self.assertNotIn("D", adjacency["C"])
+        self.model.add_prereq("C","D")
+        adjacency, indegree = self.model.build_graph()
+        self.assertIn("D", adjacency["C"])
+        self.assertEqual(indegree["D"], 1)
+
+    def test_plan_full_does_not_touch_model(self):
+        semesters = plan_full(self.model, 2)
+        self.assertEqual([set(chs) for chs, _, _ in semesters], [{"B","D"}, {"C"}])
+        self.assertEqual(self.model.passed, {"A"})
+
+    def test_suggest_by_level(self):
+        m = PMaPModel()
+        m.add_course("X2000","X",3)
+        m.add_course("Y101","Y",3)
+        m.add_course("Z","Z",3)
+        chosen, _, _ = m.suggest_next_semester(9, "nivel")
+        self.assertEqual(chosen, ["Y101","X2000","Z"])
+        self.assertNotIn("level", repr(m.courses["Y101"]))
+
+    def test_save_json_reflects_mutations(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "malla.json")
+            self.model.save_json(path)
+            self.model.mark_passed("B")
+            self.model.add_course("E","E",2)
+            self.model.save_json(path)
+            data = PMaPModel.load_json(path).to_dict()
+        self.assertEqual(data["passed"], ["A","B"])
+        self.assertIn({"code":"E","name":"E","credits":2}, data["courses"])
+
+    def test_leveled_layout(self):
+        pos = leveled_layout(self.model)
+        self.assertEqual({c: x for c, (x, _) in pos.items()}, {"A":1.0,"B":2.0,"C":3.0,"D":1.0})
+        self.assertNotEqual(pos["A"], pos["D"])
+
+    def test_json_round_trip(self):
+        self.model.add_course("E","Cálculo Ñandú",3)
+        variants = [("stdlib", None)]
+        if main.orjson is not None:
+            variants.append(("orjson", main.orjson))
+        saved = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for label, codec in variants:
+                path = os.path.join(tmp, label, "malla.json")
+                with mock.patch.object(main, "orjson", codec):
+                    self.model.save_json(path)
+                    loaded = PMaPModel.load_json(path)
+                with open(path, "rb") as f:
+                    saved[label] = f.read()
+                self.assertEqual(loaded.courses["E"].name, "Cálculo Ñandú")
+                self.assertEqual(loaded.to_dict(), self.model.to_dict())
+        self.assertIn("Cálculo Ñandú".encode("utf-8"), saved["stdlib"])
+        if "orjson" in saved:
+            self.assertEqual(saved["orjson"], saved["stdlib"])
+
 if __name__ == "__main__":
     unittest.main()